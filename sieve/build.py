@@ -1,19 +1,32 @@
 import argparse
-import io
+import functools
+import mmap
+import os
 import re
 import subprocess
 import sys
-import traceback
 from collections.abc import Callable, Generator, Iterator
 from contextlib import contextmanager, suppress
 from itertools import chain
 from pathlib import Path
 from tempfile import NamedTemporaryFile
+from types import ModuleType
 from typing import Any
 
-import yaml
+from .paths import PATH_BUILD, executable
 
-from .paths import PATH_BUILD
+
+@functools.cache
+def yaml_codec() -> tuple[ModuleType, type, type]:
+    """Import PyYAML on first use and resolve its fastest codec once.
+
+    The import costs tens of ms of cold start, so it is deferred off the
+    paths that never touch YAML (--help, argument errors). Prefers the
+    libyaml-backed loader/dumper when PyYAML was built against it.
+    """
+    import yaml
+
+    return yaml, getattr(yaml, "CSafeLoader", yaml.SafeLoader), getattr(yaml, "CSafeDumper", yaml.SafeDumper)
 
 
 def from_namespace[**A, R](func: Callable[A, R]) -> Callable[[argparse.Namespace], R]:
@@ -23,35 +36,225 @@ def from_namespace[**A, R](func: Callable[A, R]) -> Callable[[argparse.Namespace
     return decorator
 
 
-def frontmatter(markdown: str) -> tuple[dict[str, Any], str]:
-    MARKER = "---"
-    markdown = markdown.strip()
-    if markdown.startswith(MARKER):
-        mapping = markdown[len(MARKER) : markdown.find(MARKER, len(MARKER))]
-        markdown = markdown[len(mapping) + 2 * len(MARKER) :].lstrip()
-        return yaml.safe_load(mapping), markdown
-    return {}, markdown
+def read_frontmatter(path: Path, chunksize: int = 4096) -> tuple[dict[str, Any], int]:
+    """Parse only the leading ``---`` block of a file.
+
+    Reads just enough chunks to find the closing marker and decodes only the
+    header slice, so the (potentially large) body is never read or decoded —
+    pandoc re-reads the file itself for rendering. Also returns the byte
+    offset where the body starts, so later scans can skip the header.
+    """
+    yaml, Loader, _ = yaml_codec()
+    MARKER = b"---"
+    with path.open("rb") as file:
+        raw = file.read(chunksize)
+        head = raw.lstrip()
+        lead = len(raw) - len(head)
+        if not head.startswith(MARKER):
+            return {}, 0
+        while (end := head.find(MARKER, len(MARKER))) == -1:
+            if not (chunk := file.read(chunksize)):
+                return {}, 0
+            head += chunk
+    fm = yaml.load(head[len(MARKER) : end].decode("utf-8"), Loader=Loader)
+    # A header that parses to a scalar or list is not frontmatter; every
+    # caller expects a mapping.
+    return (fm if isinstance(fm, dict) else {}), lead + end + len(MARKER)
 
 
 def pandoc(src: Path, dest: Path, *args: str) -> subprocess.CompletedProcess[str]:
     return subprocess.run(
-        ["pandoc", *args, src, "-o", dest],
+        [executable("pandoc"), *args, src, "-o", dest],
         capture_output=True,
         encoding="utf-8",
         check=True,
-        shell=True,
         cwd=src.parent,
     )
 
 
+# Formats whose server responses are plain text that can be written verbatim.
+# pdf needs a LaTeX engine and binary formats arrive base64-wrapped, so both
+# stay on the one-shot subprocess path.
+PANDOC_SERVER_FORMATS = frozenset({"html", "markdown", "latex", "rst", "plain", "json", "native"})
+
+# Defaults keys the server API honors with the same meaning as a defaults
+# file. Anything outside this set goes through the CLI: the server ignores
+# unknown fields instead of rejecting them, reads `template` as template text
+# rather than a path, and never runs external filters (so sieve-mermaid would
+# be silently skipped).
+PANDOC_SERVER_FIELDS = frozenset({
+    "columns",
+    "email-obfuscation",
+    "highlight-style",
+    "identifier-prefix",
+    "metadata",
+    "number-sections",
+    "reference-links",
+    "section-divs",
+    "shift-heading-level-by",
+    "standalone",
+    "strip-comments",
+    "tab-stop",
+    "table-of-contents",
+    "toc",
+    "toc-depth",
+    "variables",
+    "wrap",
+})
+
+
+@functools.cache
+def pandoc_server() -> str | None:
+    """Launch one pandoc server for the process, returning its base URL.
+
+    The server loads the Haskell runtime and format tables once and then
+    services every conversion, where each one-shot pandoc pays that startup
+    again. None when the installed pandoc predates the server subcommand
+    (< 3.0) or it fails to come up.
+    """
+    import atexit
+    import socket
+    import time
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    try:
+        proc = subprocess.Popen(
+            [executable("pandoc"), "server", "--port", str(port)],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+    except OSError:
+        # No pandoc on PATH; let the subprocess fallback raise the real error.
+        return None
+    atexit.register(proc.terminate)
+    deadline = time.monotonic() + 5
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            return None
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.1):
+                return f"http://127.0.0.1:{port}"
+        except OSError:
+            time.sleep(0.05)
+    proc.terminate()
+    return None
+
+
+def pandoc_via_server(
+    src: Path, dest: Path, defaults: dict[str, Any], to: str
+) -> subprocess.CompletedProcess[str] | None:
+    """Convert through the shared pandoc server, if it can handle the job.
+
+    Only attempted when every defaults key is in PANDOC_SERVER_FIELDS, so the
+    request means the same thing it would in a defaults file. Returns None
+    whenever the request cannot be served — unsupported format or field, no
+    server, or any HTTP error — so the caller falls back to the one-shot
+    subprocess and its unknown-option pruning.
+    """
+    import json
+    import urllib.request
+
+    if to not in PANDOC_SERVER_FORMATS or not defaults.keys() <= PANDOC_SERVER_FIELDS:
+        return None
+    if (url := pandoc_server()) is None:
+        return None
+    payload = dict(defaults)
+    payload.update({"text": src.read_text(encoding="utf-8"), "from": "markdown", "to": to})
+    request = urllib.request.Request(  # noqa: S310 - loopback address from pandoc_server
+        url,
+        data=json.dumps(payload).encode("utf-8"),
+        headers={"Content-Type": "application/json"},
+    )
+    try:
+        with urllib.request.urlopen(request, timeout=60) as response:  # noqa: S310
+            dest.write_bytes(response.read())
+    except OSError:
+        return None
+    return subprocess.CompletedProcess([executable("pandoc"), "server"], 0, "", "")
+
+
+# Defaults-file keys with no same-named CLI flag: the help text lists
+# --filter/--variable/--metadata-file etc., so scraping it alone would strip
+# the pluralized and defaults-only spellings pandoc accepts in a defaults file.
+PANDOC_DEFAULTS_OPTIONS = frozenset({
+    "cite-method",
+    "epub-fonts",
+    "filters",
+    "html-math-method",
+    "input-file",
+    "input-files",
+    "log-file",
+    "metadata",
+    "metadata-files",
+    "output-file",
+    "pdf-engine-opts",
+    "reader",
+    "request-headers",
+    "syntax-definitions",
+    "variables",
+    "verbosity",
+    "writer",
+})
+
+
+@functools.cache
+def pandoc_known_options() -> frozenset[str]:
+    """Option names pandoc understands as defaults file keys.
+
+    Long option names scraped from the help text, plus the defaults-only
+    keys that have no matching CLI flag. This lets the frontmatter be
+    filtered up front instead of burning one pandoc invocation per unknown
+    key in the retry loop. Empty on failure, in which case the retry loop
+    handles everything as before.
+    """
+    try:
+        proc = subprocess.run(
+            [executable("pandoc"), "--help"],
+            capture_output=True,
+            encoding="utf-8",
+            check=True,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return frozenset()
+    return PANDOC_DEFAULTS_OPTIONS | frozenset(
+        match.group(1) for match in re.finditer(r"--([a-z][a-z0-9-]*)", proc.stdout)
+    )
+
+
+def defaults_to_argv(defaults: dict[str, Any]) -> tuple[list[str], dict[str, Any]]:
+    """Translate scalar defaults into pandoc CLI flags.
+
+    Returns the argv fragment plus whatever could not be expressed as a flag
+    (nested mappings, lists, explicit ``false``), which still needs a
+    defaults file. Avoiding the file skips a YAML dump, a temp-file write,
+    and a parse inside pandoc per invocation.
+    """
+    argv: list[str] = []
+    nested: dict[str, Any] = {}
+    for key, value in defaults.items():
+        if key in PANDOC_DEFAULTS_OPTIONS:
+            # No same-named CLI flag exists; only the defaults file spells it.
+            nested[key] = value
+        elif value is True:
+            argv.append(f"--{key}")
+        elif isinstance(value, str | int | float) and not isinstance(value, bool):
+            argv.append(f"--{key}={value}")
+        else:
+            nested[key] = value
+    return argv, nested
+
+
 @contextmanager
 def using_defaults(defaults: dict[str, Any]) -> Generator[Path]:
+    yaml, _, Dumper = yaml_codec()
     PATH_BUILD.mkdir(parents=True, exist_ok=True)
     try:
         with NamedTemporaryFile(
             "w", encoding="utf-8", prefix="build.", suffix=".yml", dir=PATH_BUILD, delete=False
         ) as f:
-            yaml.dump(defaults, f)
+            yaml.dump(defaults, f, Dumper=Dumper)
         path = Path(f.name)
         yield path
     finally:
@@ -70,39 +273,70 @@ def pandoc_output(inp: Path, out: Path) -> str:
     return f"pandoc {inp} -> {out}"
 
 
-RE_MARKDOWN_HEADER = re.compile(r"^(#{1,6})\s+(.*)$", re.MULTILINE)
+def debug_enabled() -> bool:
+    """Whether the verbose stderr dumps are worth serializing at all."""
+    return sys.stderr.isatty() or bool(os.environ.get("SIEVE_DEBUG"))
+
+
+def outline_markdown(markdown: bytes | mmap.mmap, pos: int = 0) -> Generator[tuple[int, str]]:
+    # Headers only ever start a line with '#', so jump between candidates
+    # with C-level find over the raw bytes — '#' and '\n' never occur inside
+    # a UTF-8 multibyte sequence, so only the title lines are ever decoded.
+    if markdown[pos : pos + 1] != b"#":
+        if (pos := markdown.find(b"\n#", pos) + 1) == 0:
+            return
+    while True:
+        end = markdown.find(b"\n", pos)
+        if end == -1:
+            end = len(markdown)
+        line = bytes(markdown[pos:end])
+        level = len(line) - len(line.lstrip(b"#"))
+        if 1 <= level <= 6 and level < len(line) and line[level : level + 1].isspace():
+            yield (level, line[level:].strip().decode("utf-8"))
+        if (pos := markdown.find(b"\n#", end) + 1) == 0:
+            return
+
+
+def outline_file(path: Path, offset: int = 0) -> list[str | dict[str, Any]]:
+    if path.stat().st_size == 0:
+        return []
+    with path.open("rb") as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+        return outline_as_tree(outline_markdown(buffer, offset))
+
 
+class _Node:
+    __slots__ = ("children", "title")
 
-def outline_markdown(markdown: str) -> Generator[tuple[int, str]]:
-    for match in RE_MARKDOWN_HEADER.finditer(markdown):
-        level = len(match.group(1))
-        title = match.group(2).strip()
-        yield (level, title)
+    def __init__(self, title: str) -> None:
+        self.title = title
+        self.children: list[_Node] = []
 
 
 def outline_as_tree(outline: Iterator[tuple[int, str]]) -> list[str | dict[str, Any]]:
-    type Node = dict[str, Any]
-    tree: Node = {}
-    stack: list[tuple[int, Node]] = [(0, tree)]
+    root = _Node("")
+    stack: list[tuple[int, _Node]] = [(0, root)]
 
     for level, title in outline:
-        node: Node = {}
-        while stack and stack[-1][0] >= level:
+        node = _Node(title)
+        while len(stack) > 1 and stack[-1][0] >= level:
             stack.pop()
-        parent = stack[-1][1]
-        parent[title] = node
+        stack[-1][1].children.append(node)
         stack.append((level, node))
 
-    def _flat_tree(node: Node) -> list[str | Node]:
-        result: list[str | Node] = []
-        for key, value in node.items():
-            if not value:
-                result.append(key)
+    # Flatten with an explicit worklist; each node appends its children in
+    # order into its own output list, so traversal order is irrelevant.
+    result: list[str | dict[str, Any]] = []
+    work: list[tuple[_Node, list[str | dict[str, Any]]]] = [(root, result)]
+    while work:
+        node, out = work.pop()
+        for child in node.children:
+            if not child.children:
+                out.append(child.title)
             else:
-                result.append({key: _flat_tree(value)})
-        return result
-
-    return _flat_tree(tree)
+                sub: list[str | dict[str, Any]] = []
+                out.append({child.title: sub})
+                work.append((child, sub))
+    return result
 
 
 @from_namespace
@@ -110,12 +344,15 @@ def main_from_markdown(input: Path, type: str, show_outline: bool, **_) -> None:
     outfile = input.with_suffix(f".{type}")
     print(pandoc_output(input, outfile), end="", file=sys.stderr, flush=True)
 
-    input_content = input.read_text(encoding="utf-8")
+    yaml, _, Dumper = yaml_codec()
+    fm, body_offset = {}, 0
 
     try:
-        fm, input_content = frontmatter(input_content)
+        fm, body_offset = read_frontmatter(input)
     except yaml.YAMLError as e:
-        fm = {}
+        import io
+        import traceback
+
         buf = io.StringIO()
         traceback.print_exc(limit=1, file=buf, chain=False)
 
@@ -124,14 +361,29 @@ def main_from_markdown(input: Path, type: str, show_outline: bool, **_) -> None:
             + "\n        ".join(chain((str(e.__class__.__name__),), str(e).splitlines())),
             file=sys.stderr,
         )
+    if known_options := pandoc_known_options():
+        fm = {k: v for k, v in fm.items() if k in known_options}
     while True:
         try:
-            with using_defaults(fm) as filepath:
-                proc = pandoc(input, outfile, "--defaults", str(filepath))
-
-            outline = outline_as_tree(outline_markdown(input_content)) if show_outline else {}
+            if (proc := pandoc_via_server(input, outfile, fm, type)) is None:
+                argv, nested = defaults_to_argv(fm)
+                if nested:
+                    with using_defaults(nested) as filepath:
+                        proc = pandoc(input, outfile, *argv, "--defaults", str(filepath))
+                else:
+                    proc = pandoc(input, outfile, *argv)
+
+            extras: list[str] = []
+            if debug_enabled():
+                # Serializing the frontmatter and walking the outline is pure
+                # logging overhead when nobody is reading stderr.
+                outline = outline_file(input, body_offset) if show_outline else {}
+                extras = [
+                    yaml.dump(fm, Dumper=Dumper, sort_keys=False),
+                    yaml.dump({"outline": outline}, Dumper=Dumper, sort_keys=False),
+                ]
             print(
-                pandoc_output_details(proc.stdout, proc.stderr, yaml.dump(fm), yaml.dump({"outline": outline})),
+                pandoc_output_details(proc.stdout, proc.stderr, *extras),
                 file=sys.stderr,
             )
             break
@@ -139,15 +391,16 @@ def main_from_markdown(input: Path, type: str, show_outline: bool, **_) -> None:
             res: str = e.stderr
             if (idx := res.rfind("Unknown option")) == -1:
                 print(
-                    pandoc_output_details(e.stdout, e.stderr, yaml.dump(fm)),
+                    pandoc_output_details(e.stdout, e.stderr, yaml.dump(fm, Dumper=Dumper)),
                     file=sys.stderr,
                 )
                 raise
             line = res[idx : res.find("\n", idx)].strip()
-            option = line.split("Unknown option")[1].strip().strip("'\"")
+            option = line.split("Unknown option")[1].strip().strip("'\".").lstrip("-")
             fm.pop(option, None)
 
 
+@functools.cache
 def cli() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser()
 
@@ -170,6 +423,10 @@ def main() -> None:
         args.py_main(args)
     except subprocess.CalledProcessError as _:
         sys.exit(1)
+    except OSError as e:
+        # e.g. pandoc missing from PATH — report and exit rather than traceback.
+        print(pandoc_output_details("", "", f"{e.__class__.__name__}: {e}"), file=sys.stderr)
+        sys.exit(1)
 
 
 if __name__ == "__main__":
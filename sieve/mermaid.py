@@ -4,7 +4,10 @@ diagrams into images.  Assumes that `mmdc` is in the path.
 Images are put in a temporary directory.
 """
 
+import asyncio
+import functools
 import hashlib
+import os
 import subprocess
 import sys
 from pathlib import Path
@@ -12,26 +15,106 @@ from pathlib import Path
 import panflute
 from panflute import Caption, CodeBlock, Doc, Element, Figure, Image, Plain, run_filter
 
-from .paths import PATH_BUILD
+from .paths import PATH_BUILD, executable
 
 PATH_MERMAID = PATH_BUILD / "mermaid"
 
+MERMAID_ARGS = ("-w", "1920", "-H", "1080", "-b", "transparent", "-f")
+_MERMAID_ARGS_KEY = "\0".join(MERMAID_ARGS).encode("utf-8")
 
-def sha1(x: str) -> str:
-    return hashlib.sha1(x.encode(sys.getfilesystemencoding())).hexdigest()  # noqa: S324
 
+@functools.lru_cache(maxsize=1024)
+def sha1(x: bytes) -> str:
+    return hashlib.sha1(x, usedforsecurity=False).hexdigest()
 
-def mermaid_compile(src: str, dst: Path) -> None:
+
+def mermaid_compile(src: bytes, dst: Path) -> None:
     proc = subprocess.Popen(
-        ["mmdc", "-i", "-", "-o", dst, "-w", "1920", "-H", "1080", "-b", "transparent", "-f"],  # noqa: S607
+        [executable("mmdc"), "-i", "-", "-o", dst, *MERMAID_ARGS],
         stdin=subprocess.PIPE,
         stdout=sys.stderr,
         stderr=sys.stderr,
-        shell=True,
     )
-    proc.communicate(input=src.encode("utf-8"))
+    proc.communicate(input=src)
+    if proc.returncode != 0:
+        raise RuntimeError(f"Failed to compile mermaid code: {src.decode('utf-8', 'replace')}")
+
+
+async def mermaid_compile_async(src: bytes, dst: Path, limit: asyncio.Semaphore) -> None:
+    async with limit:
+        proc = await asyncio.create_subprocess_exec(
+            executable("mmdc"),
+            "-i",
+            "-",
+            "-o",
+            str(dst),
+            *MERMAID_ARGS,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=sys.stderr,
+            stderr=sys.stderr,
+        )
+        await proc.communicate(input=src)
     if proc.returncode != 0:
-        raise RuntimeError(f"Failed to compile mermaid code: {src}")
+        raise RuntimeError(f"Failed to compile mermaid code: {src.decode('utf-8', 'replace')}")
+
+
+def mermaid_filetype(doc: Doc) -> str:
+    return {
+        "html": "svg",
+        "markdown": "svg",
+        "pdf": "pdf",
+        "latex": "pdf",
+    }.get(doc.format, "png")
+
+
+def mermaid_outfile(code: bytes, filetype: str) -> Path:
+    # Hash every compile input, not just the source, so changing the output
+    # format or the mmdc flags invalidates previously cached diagrams.
+    key = sha1(b"\0".join((code, filetype.encode("utf-8"), _MERMAID_ARGS_KEY)))
+    return (PATH_MERMAID / key).with_suffix(f".{filetype}")
+
+
+def mermaid_cached(outfile: Path) -> bool:
+    # A zero-byte file is a half-written casualty of an interrupted mmdc run.
+    return outfile.is_file() and outfile.stat().st_size > 0
+
+
+def prepare(doc: Doc) -> None:
+    """Compile every uncached mermaid block up front in one concurrent batch.
+
+    Each mmdc invocation pays hundreds of ms of Node.js startup, so compiling
+    N diagrams serially during the walk is the dominant cost. The walk itself
+    then finds every output already on disk.
+    """
+    filetype = mermaid_filetype(doc)
+    pending: dict[Path, bytes] = {}
+
+    def collect(elem: Element, doc: Doc) -> None:
+        if type(elem) is CodeBlock and "mermaid" in elem.classes:
+            code = elem.text.encode("utf-8")
+            outfile = mermaid_outfile(code, filetype)
+            if not mermaid_cached(outfile):
+                pending[outfile] = code
+
+    doc.walk(collect, doc=doc)
+    if not pending:
+        return
+
+    PATH_MERMAID.mkdir(parents=True, exist_ok=True)
+
+    async def compile_all() -> None:
+        # mmdc is dominated by Node.js startup IO, so concurrency scales
+        # near-linearly; the semaphore keeps process count bounded.
+        limit = asyncio.Semaphore(os.cpu_count() or 1)
+        results = await asyncio.gather(
+            *(mermaid_compile_async(code, outfile, limit) for outfile, code in pending.items()),
+            return_exceptions=True,
+        )
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+
+    asyncio.run(compile_all())
 
 
 def mermaid(elem: Element, doc: Doc) -> Element | None:
@@ -44,18 +127,16 @@ def mermaid(elem: Element, doc: Doc) -> Element | None:
     """
 
     if type(elem) is CodeBlock and "mermaid" in elem.classes:
-        code = elem.text
-        filetype = {
-            "html": "svg",
-            "markdown": "svg",
-            "pdf": "pdf",
-            "latex": "pdf",
-        }.get(doc.format, "png")
+        # Encode once; the bytes feed both the cache key and mmdc's stdin.
+        code = elem.text.encode("utf-8")
 
         PATH_MERMAID.mkdir(parents=True, exist_ok=True)
-        outfile = (PATH_MERMAID / sha1(code)).with_suffix(f".{filetype}")
+        outfile = mermaid_outfile(code, mermaid_filetype(doc))
 
-        mermaid_compile(code, outfile)
+        # Normally compiled by prepare(); the filename hashes every compile
+        # input, so an existing file is a valid cached result.
+        if not mermaid_cached(outfile):
+            mermaid_compile(code, outfile)
         print(f"Mermaid: {outfile}", file=sys.stderr)
 
         caption = (
@@ -91,4 +172,4 @@ def mermaid(elem: Element, doc: Doc) -> Element | None:
 
 
 def main(doc=None):
-    return run_filter(mermaid, doc=doc)
+    return run_filter(mermaid, prepare=prepare, doc=doc)
@@ -1,4 +1,16 @@
+import functools
+import shutil
 import tempfile
 from pathlib import Path
 
 PATH_BUILD = (Path(tempfile.gettempdir()) / "pandoc-sieve").resolve()
+
+
+@functools.cache
+def executable(name: str) -> str:
+    """Resolve an executable on PATH once per process.
+
+    On Windows `pandoc`/`mmdc` may be `.cmd` shims that need full resolution
+    when invoked without a shell; caching also skips the PATH walk per call.
+    """
+    return shutil.which(name) or name
@@ -0,0 +1,58 @@
+import subprocess
+
+from sieve import build
+from sieve.build import read_frontmatter
+
+PANDOC_HELP = """pandoc [OPTIONS] [FILES]
+  -f FORMAT, -r FORMAT  --from=FORMAT, --read=FORMAT
+  -t FORMAT, -w FORMAT  --to=FORMAT, --write=FORMAT
+  -o FILE               --output=FILE
+  -F PROGRAM            --filter=PROGRAM
+  -V KEY[:VALUE]        --variable=KEY[:VALUE]
+                        --metadata-file=FILE
+                        --toc, --table-of-contents
+                        --defaults=FILE
+"""
+
+
+def test_known_options_keep_defaults_only_keys(monkeypatch):
+    monkeypatch.setattr(
+        build.subprocess, "run", lambda argv, **_: subprocess.CompletedProcess(argv, 0, PANDOC_HELP, "")
+    )
+    build.pandoc_known_options.cache_clear()
+    try:
+        known = build.pandoc_known_options()
+    finally:
+        build.pandoc_known_options.cache_clear()
+
+    # Scraped directly from the help text.
+    assert {"toc", "output", "defaults"} <= known
+    # Defaults-file spellings whose CLI flags are named differently; stripping
+    # these would silently disable filters (including sieve-mermaid).
+    assert {"filters", "variables", "metadata-files", "log-file", "cite-method"} <= known
+
+    fm = {"filters": ["sieve-mermaid"], "variables": {"geometry": "margin=1in"}, "bogus": True}
+    assert {k: v for k, v in fm.items() if k in known} == {
+        "filters": ["sieve-mermaid"],
+        "variables": {"geometry": "margin=1in"},
+    }
+
+
+def test_read_frontmatter_normalizes_non_mapping_headers(tmp_path):
+    document = tmp_path / "doc.md"
+    document.write_text("---\nsome plain text\n---\n# Header\n", encoding="utf-8")
+    fm, offset = read_frontmatter(document)
+    assert fm == {}
+    assert document.read_text(encoding="utf-8")[offset:].lstrip().startswith("# Header")
+
+    document.write_text("---\ntitle: T\n---\nbody\n", encoding="utf-8")
+    fm, _ = read_frontmatter(document)
+    assert fm == {"title": "T"}
+
+
+def test_defaults_to_argv_routes_defaults_only_keys_to_file():
+    # cite-method has no --cite-method flag; emitting it as argv makes pandoc
+    # fail with "Unknown option" and the retry loop would drop the setting.
+    argv, nested = build.defaults_to_argv({"toc": True, "toc-depth": 2, "cite-method": "natbib"})
+    assert argv == ["--toc", "--toc-depth=2"]
+    assert nested == {"cite-method": "natbib"}